@@ -0,0 +1,132 @@
+"""Cachés para evitar evaluar varias veces el mismo contenido (ediciones y multimedia reenviada)."""
+
+import hashlib
+import re
+import unicodedata
+from collections import OrderedDict
+from difflib import SequenceMatcher
+from typing import TYPE_CHECKING, Any, Optional, Tuple
+
+if TYPE_CHECKING:
+    from telegram import Message
+
+
+# Una edición es trivial si solo cambia mayúsculas, acentos, puntuación o espacios, o si corrige
+# errores de escritura de pocos caracteres dentro de palabras largas
+TRIVIAL_EDIT_MAX_CHARS = 3
+TYPO_MIN_WORD_LENGTH = 6
+
+# Caracteres que forman enlaces, menciones o teléfonos; se conservan al normalizar
+_SIGNIFICANT_PUNCTUATION = "./@+:"
+
+_MAX_TRACKED_MESSAGES = 4096
+_MAX_CACHED_VERDICTS = 4096
+
+# Tipos de multimedia de Telegram que tienen file_unique_id
+_MEDIA_ATTRIBUTES = ("animation", "video", "document", "audio", "voice", "video_note", "sticker")
+
+# Último texto aprobado por mensaje: (chat_id, message_id) -> texto normalizado
+_moderated_texts: "OrderedDict[Tuple[int, int], str]" = OrderedDict()
+
+# Decisiones del modelo para multimedia: clave de contenido -> si es apropiado
+_media_verdicts: "OrderedDict[str, bool]" = OrderedDict()
+
+
+def _remember(cache: "OrderedDict[Any, Any]", key: Any, value: Any, max_size: int) -> None:
+    """Guardar un valor descartando las entradas más antiguas si se supera el límite"""
+    cache[key] = value
+    cache.move_to_end(key)
+    if len(cache) > max_size:
+        cache.popitem(last=False)
+
+
+def normalize_message(text: str) -> str:
+    """Normalizar el texto quitando mayúsculas, acentos, puntuación y espacios repetidos"""
+    decomposed = unicodedata.normalize("NFKD", text.lower())
+    without_accents = "".join(c for c in decomposed if not unicodedata.combining(c))
+    without_punctuation = re.sub(r"[^\w\s" + re.escape(_SIGNIFICANT_PUNCTUATION) + "]", " ", without_accents)
+    # Un punto final no es significativo; el de "ejemplo.com" sí
+    without_punctuation = re.sub(r"\.(?!\w)", " ", without_punctuation)
+    return " ".join(without_punctuation.split())
+
+
+def _typo_distance(previous: str, current: str) -> Optional[int]:
+    """Caracteres cambiados si la palabra nueva parece una corrección de la anterior, o None"""
+    if min(len(previous), len(current)) < TYPO_MIN_WORD_LENGTH or previous[0] != current[0]:
+        return None
+
+    changed = 0
+    for tag, i1, i2, j1, j2 in SequenceMatcher(None, previous, current).get_opcodes():
+        if tag == "equal":
+            continue
+        # Agregar dígitos o símbolos puede convertir el texto en un enlace, mención o teléfono
+        if any(c.isdigit() or c in _SIGNIFICANT_PUNCTUATION for c in current[j1:j2]):
+            return None
+        changed += max(i2 - i1, j2 - j1)
+    return changed
+
+
+def is_trivial_edit(previous: Optional[str], current: str) -> bool:
+    """Determinar si una edición solo corrige detalles menores del texto ya aprobado"""
+    if previous is None:
+        return False
+
+    current = normalize_message(current)
+    if previous == current:
+        return True
+
+    # Agregar, quitar o reemplazar palabras cortas puede cambiar el sentido del mensaje
+    previous_words = previous.split()
+    current_words = current.split()
+    if len(previous_words) != len(current_words):
+        return False
+
+    changed = 0
+    for previous_word, current_word in zip(previous_words, current_words):
+        if previous_word == current_word:
+            continue
+        distance = _typo_distance(previous_word, current_word)
+        if distance is None:
+            return False
+        changed += distance
+    return changed <= TRIVIAL_EDIT_MAX_CHARS
+
+
+def get_moderated_text(chat_id: int, message_id: int) -> Optional[str]:
+    """Obtener el último texto normalizado que se aprobó para un mensaje"""
+    return _moderated_texts.get((chat_id, message_id))
+
+
+def remember_moderated_text(chat_id: int, message_id: int, text: str) -> None:
+    """Recordar el texto aprobado de un mensaje para comparar futuras ediciones"""
+    _remember(_moderated_texts, (chat_id, message_id), normalize_message(text), _MAX_TRACKED_MESSAGES)
+
+
+def media_cache_key(message: "Message", text: str, guidelines_hash: str) -> Optional[str]:
+    """Clave de caché para multimedia según su file_unique_id, el pie de foto y los lineamientos"""
+    if message.photo:
+        file_unique_id = message.photo[-1].file_unique_id
+    else:
+        media = next(
+            (getattr(message, attr) for attr in _MEDIA_ATTRIBUTES if getattr(message, attr, None)),
+            None,
+        )
+        if media is None:
+            return None
+        file_unique_id = media.file_unique_id
+
+    content = "\n".join((guidelines_hash, file_unique_id, normalize_message(text)))
+    return hashlib.sha256(content.encode("utf-8")).hexdigest()
+
+
+def get_cached_verdict(key: str) -> Optional[bool]:
+    """Obtener la decisión guardada para un contenido multimedia"""
+    verdict = _media_verdicts.get(key)
+    if verdict is not None:
+        _media_verdicts.move_to_end(key)
+    return verdict
+
+
+def cache_verdict(key: str, is_appropriate: bool) -> None:
+    """Guardar la decisión del modelo para un contenido multimedia, sin textos propios del remitente"""
+    _remember(_media_verdicts, key, is_appropriate, _MAX_CACHED_VERDICTS)
@@ -0,0 +1,277 @@
+"""Compilación de la descripción del grupo en un conjunto de reglas estructuradas."""
+
+import hashlib
+import re
+import unicodedata
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+
+# Categorías de riesgo de LlamaGuard 3
+HAZARD_CATEGORIES: Dict[str, str] = {
+    "S1": "Crímenes violentos",
+    "S2": "Crímenes no violentos",
+    "S3": "Crímenes sexuales",
+    "S4": "Explotación sexual infantil",
+    "S5": "Difamación",
+    "S6": "Asesoría especializada",
+    "S7": "Privacidad",
+    "S8": "Propiedad intelectual",
+    "S9": "Armas indiscriminadas",
+    "S10": "Odio",
+    "S11": "Suicidio y autolesiones",
+    "S12": "Contenido sexual",
+    "S13": "Elecciones",
+    "S14": "Abuso de intérprete de código",
+}
+
+# Raíces de palabras clave (sin acentos, en minúsculas) que relacionan una regla con una categoría.
+# Se comparan desde el inicio de palabra; las que no son raíces indican su final con \b.
+_HAZARD_KEYWORDS: Dict[str, Tuple[str, ...]] = {
+    "S1": ("violen", "asesin", "terroris", "amenaza"),
+    "S2": ("fraude", "estafa", r"drogas?\b", r"robos?\b", "ilegal", "hackeo"),
+    "S3": ("acoso sexual", "trata de personas", "abuso sexual"),
+    "S4": ("menores de edad", "explotacion infantil", "abuso infantil", "pornografia infantil"),
+    "S5": ("difama", "calumnia"),
+    "S6": ("consejos? medicos?", "asesoria", "diagnostico"),
+    "S7": ("informacion personal", "datos personales", "privacidad", "telefono", "domicilio"),
+    "S8": ("pirateria", "derechos de autor", "propiedad intelectual"),
+    "S9": (
+        "armas (quimicas|biologicas|nucleares|radiologicas|de destruccion masiva)",
+        "explosivo",
+        r"bombas?\b",
+    ),
+    "S10": ("discrimina", r"odio\b", "racis", "xenofob", "homofob"),
+    "S11": ("suicid", "autolesion"),
+    "S12": ("adulto", "sexual", "pornograf", "desnud"),
+    "S13": ("eleccion", "electoral"),
+    "S14": ("interprete de codigo", "ejecucion de codigo"),
+}
+
+_HAZARD_PATTERNS: Dict[str, "re.Pattern[str]"] = {
+    code: re.compile(r"\b(" + "|".join(keywords) + ")")
+    for code, keywords in _HAZARD_KEYWORDS.items()
+}
+
+# Verificaciones deterministas que se aplican sin consultar al modelo.
+# Solo las de enlaces y teléfonos cubren su regla por completo y permiten omitirla del prompt.
+CHECK_NO_LINKS = "no_links"
+CHECK_NO_PHONE_NUMBERS = "no_phone_numbers"
+CHECK_NO_OTHER_GROUPS = "no_other_groups"
+
+# Dominios de primer nivel frecuentes; un dominio desconocido solo cuenta como enlace si lleva ruta
+_KNOWN_TLDS = (
+    "com|net|org|info|biz|io|me|co|ly|xyz|app|dev|ai|gg|tv|to|cc|ws|link|site|online|shop|store|"
+    "club|top|live|pro|es|mx|ar|cl|pe|uy|ve|ec|bo|py|cr|gt|hn|sv|ni|pa|do|cu|us|uk|de|fr|it|pt|br|eu|ru|cn"
+)
+_LINK_PATTERN = re.compile(
+    r"(https?://|www\.)"
+    r"|\b[\w-]+(\.[\w-]+)*\.(?P<tld>" + _KNOWN_TLDS + r")\b(?!\.\w)"
+    r"|\b[\w-]+(\.[\w-]+)*\.[a-z]{2,}/\S*",
+    re.IGNORECASE,
+)
+# Una oración pegada al punto ("Gracias.Me encanta") no es un enlace
+_SENTENCE_AFTER_DOT = re.compile(r"\s+\w")
+
+# Secuencias de dígitos candidatas a teléfono; _is_phone_number decide si tienen forma de teléfono
+_PHONE_CANDIDATE = re.compile(r"(?<![\w.,+-])\+?\(?\d[\d \t().-]*\d(?![\w.,-]?\d)")
+_YEAR = re.compile(r"(19|20)\d\d")
+_OTHER_GROUP_PATTERN = re.compile(
+    r"((t|telegram)\.me/\S+|@\w*(group|grupo|channel|canal|chat)\b)",
+    re.IGNORECASE,
+)
+
+# Reglas que prohíben enlaces de forma general ("No se permiten links", "No compartir enlaces externos")
+_RULE_NO_LINKS = re.compile(r"\b(links?|enlaces?|urls?)\b(\s+(externos?|de ningun tipo))?\s*[.!]?$")
+_RULE_NO_PHONE = re.compile(r"\b(telefonos?|celulares?|whatsapp|numeros? de (telefono|celular|contacto))\b")
+_RULE_PERSONAL_INFO = re.compile(r"\b(informacion personal|datos personales)\b")
+_RULE_NO_OTHER_GROUPS = re.compile(
+    r"\b(a )?otros (grupos?|canales?|chats?)( (o|y|ni|u) (grupos?|canales?|chats?))?\b"
+)
+_RULE_CONJUNCTION = re.compile(r"(\b(ni|y|o|e|u)\b|,)")
+
+_PROHIBITION = re.compile(r"\b(no|prohibid[oa]s?|evita[rn]?|nada)\b")
+_NUMBERED_LINE = re.compile(r"^\s*(\d+[.)-]|[-*•])\s*")
+
+_MAX_CACHED_GUIDELINES = 256
+
+
+@dataclass(frozen=True)
+class GuidelineRule:
+    """Regla individual extraída de la descripción del grupo"""
+    number: int
+    text: str
+    hazard_categories: Tuple[str, ...] = ()
+    checks: Tuple[str, ...] = ()
+    # Si la regla queda cubierta por completo por las verificaciones deterministas
+    deterministic_only: bool = False
+
+
+@dataclass(frozen=True)
+class CompiledGuidelines:
+    """Lineamientos del grupo ya compilados"""
+    content_hash: str
+    rules: Tuple[GuidelineRule, ...]
+    prompt: str
+    checks: Dict[str, GuidelineRule] = field(default_factory=dict)
+
+
+_compiled_cache: "OrderedDict[str, CompiledGuidelines]" = OrderedDict()
+
+
+def _normalize(text: str) -> str:
+    """Pasar a minúsculas y quitar acentos para comparar palabras clave"""
+    decomposed = unicodedata.normalize("NFKD", text.lower())
+    return "".join(c for c in decomposed if not unicodedata.combining(c))
+
+
+def _split_rules(description: str) -> List[str]:
+    """Separar la descripción en reglas, por líneas numeradas o por oraciones"""
+    lines = [line.strip() for line in description.splitlines() if line.strip()]
+    if len(lines) > 1 and any(_NUMBERED_LINE.match(line) for line in lines):
+        return [_NUMBERED_LINE.sub("", line).strip() for line in lines]
+
+    sentences = re.split(r"(?<=[.!?;])\s+", " ".join(lines))
+    return [s.strip() for s in sentences if s.strip()]
+
+
+def _match_categories(normalized: str) -> Tuple[str, ...]:
+    """Categorías de riesgo cuyas palabras clave aparecen en el texto"""
+    return tuple(
+        code for code in _HAZARD_KEYWORDS
+        if _HAZARD_PATTERNS[code].search(normalized)
+    )
+
+
+def _compile_rule(number: int, text: str) -> GuidelineRule:
+    """Relacionar una regla con categorías de riesgo y verificaciones deterministas"""
+    normalized = _normalize(text).strip()
+    categories = _match_categories(normalized)
+
+    checks: List[str] = []
+    remainder = normalized
+    if _PROHIBITION.search(normalized):
+        if _RULE_NO_LINKS.search(normalized):
+            checks.append(CHECK_NO_LINKS)
+            remainder = _RULE_NO_LINKS.sub(" ", remainder)
+        if _RULE_NO_PHONE.search(normalized):
+            checks.append(CHECK_NO_PHONE_NUMBERS)
+            remainder = _RULE_NO_PHONE.sub(" ", remainder)
+        elif _RULE_PERSONAL_INFO.search(normalized):
+            # La información personal incluye teléfonos, pero el modelo debe revisar el resto
+            checks.append(CHECK_NO_PHONE_NUMBERS)
+        if _RULE_NO_OTHER_GROUPS.search(normalized):
+            # Los grupos se pueden mencionar con cualquier @usuario, así que el modelo también revisa la regla
+            checks.append(CHECK_NO_OTHER_GROUPS)
+
+    # Solo se omite del prompt si, quitando lo que cubren las verificaciones, no queda otra prohibición
+    deterministic_only = (
+        remainder != normalized
+        and not _match_categories(remainder)
+        and not _RULE_CONJUNCTION.search(remainder)
+    )
+
+    return GuidelineRule(
+        number=number,
+        text=text,
+        hazard_categories=categories,
+        checks=tuple(checks),
+        deterministic_only=deterministic_only,
+    )
+
+
+def _build_prompt(rules: Tuple[GuidelineRule, ...]) -> str:
+    """Generar el texto canónico y breve de los lineamientos para el modelo"""
+    lines = []
+    prompt_rules = [rule for rule in rules if not rule.deterministic_only]
+    for rule in prompt_rules:
+        tags = f" [{', '.join(rule.hazard_categories)}]" if rule.hazard_categories else ""
+        lines.append(f"{rule.number}. {rule.text}{tags}")
+
+    used = sorted(
+        {code for rule in prompt_rules for code in rule.hazard_categories},
+        key=lambda code: int(code[1:]),
+    )
+    if used:
+        lines.append("Categorías: " + "; ".join(f"{code} {HAZARD_CATEGORIES[code]}" for code in used))
+
+    if not lines:
+        return "Sin reglas adicionales. Aplica las categorías de riesgo estándar."
+    return "\n".join(lines)
+
+
+def compile_guidelines(description: str) -> CompiledGuidelines:
+    """Compilar la descripción del grupo, reutilizando el resultado si ya se compiló"""
+    content_hash = hashlib.sha256(description.strip().encode("utf-8")).hexdigest()
+    cached = _compiled_cache.get(content_hash)
+    if cached is not None:
+        _compiled_cache.move_to_end(content_hash)
+        return cached
+
+    rules = tuple(
+        _compile_rule(number, text)
+        for number, text in enumerate(_split_rules(description), start=1)
+    )
+    checks: Dict[str, GuidelineRule] = {}
+    for rule in rules:
+        for check in rule.checks:
+            checks.setdefault(check, rule)
+
+    compiled = CompiledGuidelines(
+        content_hash=content_hash,
+        rules=rules,
+        prompt=_build_prompt(rules),
+        checks=checks,
+    )
+
+    _compiled_cache[content_hash] = compiled
+    if len(_compiled_cache) > _MAX_CACHED_GUIDELINES:
+        _compiled_cache.popitem(last=False)
+    return compiled
+
+
+def _contains_link(text: str) -> bool:
+    """Si el texto contiene un enlace: con esquema, con www. o un dominio"""
+    for match in _LINK_PATTERN.finditer(text):
+        tld = match.group("tld")
+        if tld and tld.istitle() and _SENTENCE_AFTER_DOT.match(text, match.end()):
+            continue
+        return True
+    return False
+
+
+def _is_phone_number(candidate: str) -> bool:
+    """Si una secuencia de dígitos tiene forma de teléfono y no de fecha, año o cantidad"""
+    groups = re.findall(r"\d+", candidate)
+    digits = sum(len(group) for group in groups)
+    if candidate.startswith("+"):
+        return 8 <= digits <= 15
+
+    if not 9 <= digits <= 12:
+        return False
+    if len(groups) == 1:
+        return digits <= 10
+    if len(groups[0]) < 2 or any(not 2 <= len(group) <= 4 for group in groups):
+        return False
+
+    separators = set(re.sub(r"[\d()]", "", candidate))
+    # 1.500.000 o 612.345.678: cantidades con separadores de miles
+    if separators <= {"."} and all(len(group) == 3 for group in groups[1:]):
+        return False
+    # 2020 2022 2024: listas de años
+    if all(_YEAR.fullmatch(group) for group in groups):
+        return False
+    return True
+
+
+def check_deterministic_rules(guidelines: CompiledGuidelines, text: str) -> Optional[GuidelineRule]:
+    """Devolver la primera regla que el mensaje viola según las verificaciones deterministas"""
+    if CHECK_NO_OTHER_GROUPS in guidelines.checks and _OTHER_GROUP_PATTERN.search(text):
+        return guidelines.checks[CHECK_NO_OTHER_GROUPS]
+    if CHECK_NO_LINKS in guidelines.checks and _contains_link(text):
+        return guidelines.checks[CHECK_NO_LINKS]
+    if CHECK_NO_PHONE_NUMBERS in guidelines.checks:
+        if any(_is_phone_number(match.group()) for match in _PHONE_CANDIDATE.finditer(text)):
+            return guidelines.checks[CHECK_NO_PHONE_NUMBERS]
+    return None
@@ -23,8 +23,11 @@ def main() -> None:
     application.add_handler(CommandHandler("start", start))
     application.add_handler(CommandHandler("help", help_command))
     
-    # Manejar mensajes normales
-    application.add_handler(MessageHandler(filters.TEXT & ~filters.COMMAND, moderate_message))
+    # Manejar mensajes normales y editados, tanto de texto como con pie de foto/video
+    application.add_handler(MessageHandler(
+        (filters.TEXT | filters.CAPTION) & ~filters.COMMAND & filters.UpdateType.MESSAGES,
+        moderate_message
+    ))
 
     # Iniciar el bot
     logger.info("Iniciando el bot moderador de Telegram...")
@@ -7,7 +7,14 @@ from dataclasses import dataclass
 from langchain_ollama import OllamaLLM
 from langchain.prompts import PromptTemplate
 from langchain.output_parsers import PydanticOutputParser
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, PrivateAttr
+
+
+# Razón usada cuando el modelo no pudo evaluar el mensaje
+EVALUATION_ERROR_REASON = (
+    "Error en la evaluación del mensaje. Por seguridad, se ha eliminado. "
+    "Los administradores revisarán este caso."
+)
 
 
 class ModeratorOutput(BaseModel):
@@ -15,6 +22,13 @@ class ModeratorOutput(BaseModel):
     is_appropriate: bool = Field(description="Si el mensaje cumple con las reglas del grupo")
     violation_reason: Optional[str] = Field(None, description="Razón por la que el mensaje viola las reglas")
     improved_message: Optional[str] = Field(None, description="Versión mejorada del mensaje si es posible")
+    # Marca interna; al ser privada no forma parte del esquema que se pide al modelo
+    _evaluation_failed: bool = PrivateAttr(default=False)
+
+    @property
+    def evaluation_failed(self) -> bool:
+        """Si el mensaje no se pudo evaluar y el resultado es el predeterminado por seguridad"""
+        return self._evaluation_failed
 
 
 def setup_moderator_agent(provider="ollama", **kwargs):
@@ -152,8 +166,10 @@ async def moderate_content(chain, group_guidelines, message_text, username):
         # En caso de error, permitir el mensaje por defecto
         print(f"Error al moderar contenido: {e}")
         # Por seguridad, ahora por defecto marcamos como NO apropiado si hay un error irrecuperable
-        return ModeratorOutput(
+        result = ModeratorOutput(
             is_appropriate=False,  # Por defecto, NO permitir en caso de error
-            violation_reason="Error en la evaluación del mensaje. Por seguridad, se ha eliminado. Los administradores revisarán este caso.",
+            violation_reason=EVALUATION_ERROR_REASON,
             improved_message=None
-        )
\ No newline at end of file
+        )
+        result._evaluation_failed = True
+        return result
\ No newline at end of file
@@ -5,7 +5,20 @@ import os
 from telegram import Update, Bot
 from telegram.ext import ContextTypes
 from telegram_moderator_bot.config import LLAMAGUARD_PROVIDER, OLLAMA_HOST
-from telegram_moderator_bot.moderation import setup_moderator_agent, moderate_content
+from telegram_moderator_bot.moderation import (
+    setup_moderator_agent,
+    moderate_content,
+    ModeratorOutput,
+)
+from telegram_moderator_bot.guidelines import compile_guidelines, check_deterministic_rules
+from telegram_moderator_bot.deduplication import (
+    is_trivial_edit,
+    get_moderated_text,
+    remember_moderated_text,
+    media_cache_key,
+    get_cached_verdict,
+    cache_verdict,
+)
 
 # Configuración de logging
 logging.basicConfig(
@@ -14,6 +27,9 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Razón mostrada cuando la decisión sobre un contenido multimedia viene de la caché
+MEDIA_VIOLATION_REASON = "Este contenido ya fue identificado como inapropiado para los lineamientos del grupo."
+
 # Inicializar el agente moderador
 def get_moderator_agent():
     """Obtener una instancia del agente moderador según la configuración"""
@@ -70,22 +86,43 @@ async def get_group_description(bot: Bot, chat_id: int) -> str:
 
 
 async def moderate_message(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
-    """Moderar mensajes del grupo usando LlamaGuard"""
-    # Ignorar mensajes de comandos y del propio bot
-    if not update.message or not update.message.text:
+    """Moderar mensajes del grupo usando LlamaGuard, incluyendo ediciones y pies de foto"""
+    # Mensajes nuevos o editados, con texto o con pie de foto/video
+    message = update.effective_message
+    if not message:
+        return
+    text = message.text or message.caption
+    if not text:
         return
         
-    if update.message.text.startswith('/') or update.effective_user.id == context.bot.id:
+    # Ignorar mensajes de comandos y del propio bot
+    if text.startswith('/') or update.effective_user.id == context.bot.id:
         return
     
     # Obtener información necesaria
     chat_id = update.effective_chat.id
-    message_id = update.message.message_id  # ID del mensaje original del usuario
+    message_id = message.message_id  # ID del mensaje original del usuario
     user = update.effective_user
     username = user.username or user.first_name
-    text = update.message.text
     
-    # Verificar permisos del bot
+    # Obtener lineamientos del grupo (compilados una sola vez por cada descripción)
+    group_description = await get_group_description(context.bot, chat_id)
+    group_guidelines = compile_guidelines(group_description)
+    
+    # Aplicar primero las reglas deterministas, sin consultar al modelo
+    violated_rule = check_deterministic_rules(group_guidelines, text)
+    status_message_id = None
+    
+    # Omitir ediciones que solo corrigen detalles de un texto ya aprobado
+    if (
+        not violated_rule
+        and update.edited_message
+        and is_trivial_edit(get_moderated_text(chat_id, message_id), text)
+    ):
+        logger.info(f"Edición trivial del mensaje {message_id}, no se vuelve a revisar")
+        return
+    
+    # Verificar permisos del bot (después de omitir las ediciones triviales, para no consultar la API)
     try:
         bot_member = await context.bot.get_chat_member(chat_id, context.bot.id)
         if not bot_member.can_delete_messages:
@@ -98,28 +135,48 @@ async def moderate_message(update: Update, context: ContextTypes.DEFAULT_TYPE) -
     except Exception as e:
         logger.error(f"Error al verificar permisos: {e}")
     
-    # Obtener lineamientos del grupo
-    group_guidelines = await get_group_description(context.bot, chat_id)
-    
-    # Informar al usuario que su mensaje está siendo revisado
-    status_message = await context.bot.send_message(
-        chat_id=chat_id,
-        reply_to_message_id=message_id,
-        text="⏳ Revisando este mensaje..."
-    )
-    status_message_id = status_message.message_id  # Guardar el ID del mensaje de estado
+    # La misma multimedia reenviada con el mismo pie de foto se evalúa una sola vez
+    media_key = media_cache_key(message, text, group_guidelines.content_hash)
+    cached_verdict = get_cached_verdict(media_key) if media_key else None
     
     try:
-        # Obtener el agente moderador
-        moderator_agent = get_moderator_agent()
-        
-        # Evaluar el mensaje
-        result = await moderate_content(
-            moderator_agent, 
-            group_guidelines,
-            text,
-            username
-        )
+        if violated_rule:
+            result = ModeratorOutput(
+                is_appropriate=False,
+                violation_reason=f"Regla {violated_rule.number}: {violated_rule.text}",
+                improved_message=None
+            )
+        elif cached_verdict is not None:
+            # Solo se guarda la decisión; las razones y sugerencias del modelo eran para otro remitente
+            logger.info(f"Veredicto en caché para multimedia del mensaje {message_id}")
+            result = ModeratorOutput(
+                is_appropriate=cached_verdict,
+                violation_reason=None if cached_verdict else MEDIA_VIOLATION_REASON,
+                improved_message=None
+            )
+        else:
+            # Informar al usuario que su mensaje está siendo revisado
+            status_message = await context.bot.send_message(
+                chat_id=chat_id,
+                reply_to_message_id=message_id,
+                text="⏳ Revisando este mensaje..."
+            )
+            status_message_id = status_message.message_id  # Guardar el ID del mensaje de estado
+            
+            # Obtener el agente moderador
+            moderator_agent = get_moderator_agent()
+            
+            # Evaluar el mensaje
+            result = await moderate_content(
+                moderator_agent, 
+                group_guidelines.prompt,
+                text,
+                username
+            )
+            
+            # No guardar en caché los errores de evaluación
+            if media_key and not result.evaluation_failed:
+                cache_verdict(media_key, result.is_appropriate)
         
         print(f"Resultado de moderación: {result}")
         print(f"¿Es apropiado?: {result.is_appropriate}")
@@ -131,7 +188,8 @@ async def moderate_message(update: Update, context: ContextTypes.DEFAULT_TYPE) -
             await context.bot.delete_message(chat_id=chat_id, message_id=message_id)
             
             # También eliminar el mensaje de estado
-            await context.bot.delete_message(chat_id=chat_id, message_id=status_message_id)
+            if status_message_id:
+                await context.bot.delete_message(chat_id=chat_id, message_id=status_message_id)
             
             # Notificar al usuario
             violation_message = (
@@ -148,12 +206,18 @@ async def moderate_message(update: Update, context: ContextTypes.DEFAULT_TYPE) -
                 text=violation_message
             )
         else:
+            # Recordar el texto aprobado para comparar futuras ediciones
+            remember_moderated_text(chat_id, message_id, text)
+            
             # El mensaje es apropiado - Solo eliminar el mensaje de estado, NO el mensaje original
-            print(f"Mensaje apropiado, eliminando solo mensaje de estado ID: {status_message_id}")
-            await context.bot.delete_message(chat_id=chat_id, message_id=status_message_id)
+            if status_message_id:
+                print(f"Mensaje apropiado, eliminando solo mensaje de estado ID: {status_message_id}")
+                await context.bot.delete_message(chat_id=chat_id, message_id=status_message_id)
     
     except Exception as e:
         logger.error(f"Error al moderar el mensaje: {e}")
+        if not status_message_id:
+            return
         await context.bot.edit_message_text(
             chat_id=chat_id,
             message_id=status_message_id,
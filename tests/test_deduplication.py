@@ -0,0 +1,133 @@
+"""Pruebas para las cachés de ediciones y multimedia."""
+
+from collections import OrderedDict
+from types import SimpleNamespace
+
+import pytest
+
+from telegram_moderator_bot import deduplication
+from telegram_moderator_bot.deduplication import (
+    _remember,
+    cache_verdict,
+    get_cached_verdict,
+    get_moderated_text,
+    is_trivial_edit,
+    media_cache_key,
+    normalize_message,
+    remember_moderated_text,
+)
+
+
+@pytest.fixture(autouse=True)
+def clear_caches():
+    deduplication._moderated_texts.clear()
+    deduplication._media_verdicts.clear()
+    yield
+    deduplication._moderated_texts.clear()
+    deduplication._media_verdicts.clear()
+
+
+def make_message(**media):
+    attributes = {"photo": [], **{attr: None for attr in deduplication._MEDIA_ATTRIBUTES}}
+    attributes.update(media)
+    return SimpleNamespace(**attributes)
+
+
+def test_normalize_message():
+    assert normalize_message("  ¡Hola,   AMIGO! ¿Cómo estás? ") == "hola amigo como estas"
+
+
+def test_normalize_message_drops_final_dots():
+    assert normalize_message("Hola... ¿qué tal.") == "hola que tal"
+
+
+def test_normalize_message_keeps_link_characters():
+    assert normalize_message("Visita WWW.Ejemplo.com/oferta") == "visita www.ejemplo.com/oferta"
+    assert normalize_message("Únete a @GrupoCripto o llama al +52 55") == "unete a @grupocripto o llama al +52 55"
+
+
+@pytest.mark.parametrize("previous, current", [
+    ("Hola amigo!", "hola amigo"),
+    ("Hola amigo", "Hola amigo."),
+    ("hola 😀", "Hola"),
+    ("Buenos dias", "Buenos días"),
+    ("Muchas graicas por todo", "Muchas gracias por todo"),
+    ("Excelente reunoin", "Excelente reunión"),
+])
+def test_trivial_edits(previous, current):
+    assert is_trivial_edit(normalize_message(previous), current)
+
+
+@pytest.mark.parametrize("previous, current", [
+    ("es bueno", "no es bueno"),
+    ("me gusta mucho", "me disgusta bastante"),
+    ("visita ejemplo com", "visita ejemplo.com"),
+    ("www ejemplo com", "www.ejemplo.com"),
+    ("t me cripto", "t.me/cripto"),
+    ("unete a grupocripto", "unete a @grupocripto"),
+    ("llama al", "llama al 5512345678"),
+    ("Yo no apoyo matar judios", "Yo si apoyo matar judios"),
+    ("no hay que matarlos", "ya hay que matarlos"),
+    ("Vamos por la ruta", "Vamos por la puta"),
+    ("Puedo poder", "Puedo joder"),
+    ("Hola amgio", "Hola amigo"),
+])
+def test_non_trivial_edits(previous, current):
+    assert not is_trivial_edit(normalize_message(previous), current)
+
+
+def test_edit_without_previous_text_is_not_trivial():
+    assert not is_trivial_edit(None, "hola")
+
+
+def test_remember_moderated_text():
+    remember_moderated_text(1, 10, "¡Hola Amigo!")
+    assert get_moderated_text(1, 10) == "hola amigo"
+    assert get_moderated_text(2, 10) is None
+
+
+def test_remember_evicts_oldest_entry():
+    cache = OrderedDict()
+    _remember(cache, "a", 1, max_size=2)
+    _remember(cache, "b", 2, max_size=2)
+    _remember(cache, "a", 3, max_size=2)
+    _remember(cache, "c", 4, max_size=2)
+    assert list(cache.items()) == [("a", 3), ("c", 4)]
+
+
+def test_media_cache_key_uses_largest_photo():
+    small = SimpleNamespace(file_unique_id="small")
+    large = SimpleNamespace(file_unique_id="large")
+    photo_key = media_cache_key(make_message(photo=[small, large]), "Compra ya", "h")
+    same_photo = media_cache_key(make_message(photo=[large]), "compra ya!", "h")
+    other_photo = media_cache_key(make_message(photo=[small]), "Compra ya", "h")
+    assert photo_key == same_photo
+    assert photo_key != other_photo
+
+
+def test_media_cache_key_for_other_media():
+    video = SimpleNamespace(file_unique_id="video")
+    key = media_cache_key(make_message(video=video), "Compra ya", "h")
+    assert key is not None
+    assert key != media_cache_key(make_message(video=video), "Otro texto", "h")
+    assert key != media_cache_key(make_message(video=video), "Compra ya", "otros lineamientos")
+
+
+def test_media_cache_key_without_media():
+    assert media_cache_key(make_message(), "Hola", "h") is None
+
+
+def test_cached_verdicts():
+    assert get_cached_verdict("clave") is None
+    cache_verdict("clave", False)
+    assert get_cached_verdict("clave") is False
+
+
+def test_cached_verdicts_are_bounded(monkeypatch):
+    monkeypatch.setattr(deduplication, "_MAX_CACHED_VERDICTS", 2)
+    cache_verdict("a", True)
+    cache_verdict("b", True)
+    assert get_cached_verdict("a") is True
+    cache_verdict("c", False)
+    assert get_cached_verdict("b") is None
+    assert get_cached_verdict("a") is True
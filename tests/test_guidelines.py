@@ -0,0 +1,216 @@
+"""Pruebas para la compilación de lineamientos del grupo."""
+
+import pytest
+
+from telegram_moderator_bot import guidelines
+from telegram_moderator_bot.guidelines import (
+    CHECK_NO_LINKS,
+    CHECK_NO_OTHER_GROUPS,
+    CHECK_NO_PHONE_NUMBERS,
+    _compile_rule,
+    _split_rules,
+    check_deterministic_rules,
+    compile_guidelines,
+)
+
+
+# Lineamientos usados en test_moderation.py
+NUMBERED_GUIDELINES = """
+    1. No insultos ni lenguaje ofensivo
+    2. No spam ni contenido comercial
+    3. Mantener discusiones respetuosas
+    4. No compartir información personal
+    5. No mencionar a otros grupos o canales
+    6. No compartir links de adultos
+    7. No compartir links maliciosos
+    8. No ofrecer productos o servicios
+    """
+
+STRICT_GUIDELINES = """
+    1. No se permiten enlaces.
+    2. No compartir números de teléfono
+    3. No mencionar a otros grupos o canales
+    """
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    guidelines._compiled_cache.clear()
+    yield
+    guidelines._compiled_cache.clear()
+
+
+def test_split_numbered_lines():
+    rules = _split_rules(NUMBERED_GUIDELINES)
+    assert len(rules) == 8
+    assert rules[0] == "No insultos ni lenguaje ofensivo"
+    assert rules[4] == "No mencionar a otros grupos o canales"
+
+
+def test_split_sentences():
+    rules = _split_rules(
+        "Este es un grupo respetuoso. No se permite spam; "
+        "tampoco contenido para adultos!"
+    )
+    assert rules == [
+        "Este es un grupo respetuoso.",
+        "No se permite spam;",
+        "tampoco contenido para adultos!",
+    ]
+
+
+@pytest.mark.parametrize("text, checks", [
+    ("No se permiten enlaces.", (CHECK_NO_LINKS,)),
+    ("No compartir números de teléfono", (CHECK_NO_PHONE_NUMBERS,)),
+])
+def test_rule_fully_covered_by_checks(text, checks):
+    rule = _compile_rule(1, text)
+    assert rule.checks == checks
+    assert rule.deterministic_only
+
+
+@pytest.mark.parametrize("text", [
+    "No compartir información personal",
+    "No compartir links de adultos",
+    "No compartir links maliciosos",
+    "No se permiten enlaces ni spam",
+    "Mantener discusiones respetuosas",
+])
+def test_rule_still_needs_model(text):
+    assert not _compile_rule(1, text).deterministic_only
+
+
+@pytest.mark.parametrize("text", [
+    "No mencionar a otros grupos o canales",
+    "No publicar enlaces a otros grupos",
+])
+def test_other_groups_rule_stays_in_prompt(text):
+    rule = _compile_rule(1, text)
+    assert rule.checks == (CHECK_NO_OTHER_GROUPS,)
+    assert not rule.deterministic_only
+
+
+def test_group_mention_missed_by_checks_reaches_model():
+    compiled = compile_guidelines(STRICT_GUIDELINES)
+    assert check_deterministic_rules(compiled, "únete a @criptoganancias") is None
+    assert "3. No mencionar a otros grupos o canales" in compiled.prompt
+
+
+def test_personal_information_enables_phone_check():
+    rule = _compile_rule(4, "No compartir información personal")
+    assert rule.checks == (CHECK_NO_PHONE_NUMBERS,)
+    assert rule.hazard_categories == ("S7",)
+
+
+@pytest.mark.parametrize("text, categories", [
+    ("No se permite contenido para adultos", ("S12",)),
+    ("Nada relacionado con el suicidio", ("S11",)),
+    ("No se permite el odio ni la discriminación", ("S10",)),
+    ("Prohibido hablar de robos o drogas", ("S2",)),
+    ("No compartir fotos de menores de edad", ("S4",)),
+    ("No hablar de armas químicas", ("S9",)),
+])
+def test_hazard_categories(text, categories):
+    assert _compile_rule(1, text).hazard_categories == categories
+
+
+@pytest.mark.parametrize("text", [
+    "Cuidar los detalles menores",
+    "Comentar cada episodio",
+    "Hablar sobre robots",
+    "Configurar las alarmas",
+    "Nada relacionado a la muerte",
+])
+def test_hazard_categories_without_false_matches(text):
+    assert _compile_rule(1, text).hazard_categories == ()
+
+
+def test_prompt_omits_deterministic_rules():
+    compiled = compile_guidelines(STRICT_GUIDELINES)
+    assert "No se permiten enlaces." not in compiled.prompt
+    assert "No compartir números de teléfono" not in compiled.prompt
+    assert compiled.prompt.splitlines()[0] == "3. No mencionar a otros grupos o canales"
+
+
+def test_prompt_keeps_model_rules():
+    compiled = compile_guidelines(NUMBERED_GUIDELINES)
+    assert "5. No mencionar a otros grupos o canales" in compiled.prompt
+    assert "4. No compartir información personal [S7]" in compiled.prompt
+    assert "Categorías: S7 Privacidad; S12 Contenido sexual" in compiled.prompt
+
+
+def test_prompt_without_rules():
+    compiled = compile_guidelines("1. No se permiten enlaces.\n2. No compartir números de teléfono")
+    assert compiled.prompt == "Sin reglas adicionales. Aplica las categorías de riesgo estándar."
+
+
+def test_compile_uses_cache_by_content_hash():
+    first = compile_guidelines(NUMBERED_GUIDELINES)
+    assert compile_guidelines(NUMBERED_GUIDELINES) is first
+    assert compile_guidelines(NUMBERED_GUIDELINES + "\n  ") is first
+    assert compile_guidelines(STRICT_GUIDELINES) is not first
+    assert len(guidelines._compiled_cache) == 2
+
+
+def test_compile_cache_is_bounded(monkeypatch):
+    monkeypatch.setattr(guidelines, "_MAX_CACHED_GUIDELINES", 2)
+    first = compile_guidelines("Regla uno.")
+    compile_guidelines("Regla dos.")
+    compile_guidelines("Regla tres.")
+    assert first.content_hash not in guidelines._compiled_cache
+    assert len(guidelines._compiled_cache) == 2
+
+
+@pytest.mark.parametrize("text, rule_number", [
+    ("Visiten www.spam.com", 1),
+    ("Compra en HTTPS://tienda.example", 1),
+    ("visita ejemplo.com hoy", 1),
+    ("Compra en tienda.es", 1),
+    ("Entra a discord.gg/abc", 1),
+    ("EJEMPLO.COM", 1),
+    ("Visita Ejemplo.com", 1),
+    ("Mira ofertas.raras/promo", 1),
+    ("Mi número es +52 55 1234 5678", 2),
+    ("Llámame al (55) 1234-5678", 2),
+    ("Mi celular 5512345678", 2),
+    ("Escríbeme al 612 34 56 78", 2),
+    ("Mi número: 55 12 34 56 78", 2),
+    ("Llama al 612 345 678", 2),
+    ("Únete a t.me/cripto", 3),
+    ("Síganos en @cripto_grupo", 3),
+])
+def test_deterministic_violations(text, rule_number):
+    compiled = compile_guidelines(STRICT_GUIDELINES)
+    rule = check_deterministic_rules(compiled, text)
+    assert rule is not None
+    assert rule.number == rule_number
+
+
+@pytest.mark.parametrize("text", [
+    "Hola a todos, ¿cómo están?",
+    "Gracias.Me encanta la idea",
+    "Nos vemos el 2024-01-15",
+    "Ganamos 2020-2024 seguidos",
+    "Cuesta 1.500.000.000",
+    "Tengo 3 gatos y 2000 pesos",
+    "Gracias @juan por la ayuda",
+    "Fin.Luego seguimos",
+    "Ganamos en 2018 2020 2022",
+    "Son 10.500.000.000 de pesos",
+    "Llegamos a las 10.30",
+])
+def test_deterministic_allowed(text):
+    compiled = compile_guidelines(STRICT_GUIDELINES)
+    assert check_deterministic_rules(compiled, text) is None
+
+
+def test_personal_information_rule_ignores_dates_and_amounts():
+    compiled = compile_guidelines(NUMBERED_GUIDELINES)
+    for text in ("Nos vemos el 2024-01-15", "Ganamos 2020-2024 seguidos", "Cuesta 1.500.000.000"):
+        assert check_deterministic_rules(compiled, text) is None
+    assert check_deterministic_rules(compiled, "Mi número es 123 456 7890").number == 4
+
+
+def test_no_checks_without_rules():
+    compiled = compile_guidelines("Este es un grupo de discusión respetuoso.")
+    assert check_deterministic_rules(compiled, "www.spam.com +52 55 1234 5678") is None
@@ -0,0 +1,197 @@
+"""Pruebas del flujo de moderación en los manejadores de Telegram."""
+
+import asyncio
+import os
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip("telegram")
+pytest.importorskip("langchain_ollama")
+os.environ.setdefault("TELEGRAM_BOT_TOKEN", "test-token")
+
+from telegram_moderator_bot import deduplication, guidelines, telegram_handlers  # noqa: E402
+from telegram_moderator_bot.moderation import ModeratorOutput  # noqa: E402
+
+
+CHAT_ID = -100
+BOT_ID = 1
+USER_ID = 2
+MESSAGE_ID = 10
+STATUS_MESSAGE_ID = 99
+
+GUIDELINES = """
+    1. No se permiten enlaces.
+    2. No insultos ni lenguaje ofensivo
+    """
+
+
+class FakeBot:
+    """Bot de Telegram que registra las llamadas a la API"""
+
+    id = BOT_ID
+
+    def __init__(self, description=GUIDELINES):
+        self.description = description
+        self.calls = []
+
+    async def get_chat_member(self, chat_id, user_id):
+        self.calls.append("get_chat_member")
+        return SimpleNamespace(can_delete_messages=True)
+
+    async def get_chat(self, chat_id):
+        self.calls.append("get_chat")
+        return SimpleNamespace(description=self.description)
+
+    async def send_message(self, chat_id, text, reply_to_message_id=None):
+        self.calls.append(("send_message", text))
+        return SimpleNamespace(message_id=STATUS_MESSAGE_ID)
+
+    async def delete_message(self, chat_id, message_id):
+        self.calls.append(("delete_message", message_id))
+
+    async def edit_message_text(self, chat_id, message_id, text):
+        self.calls.append(("edit_message_text", text))
+
+    def sent_texts(self):
+        return [call[1] for call in self.calls if call[0] == "send_message"]
+
+    def deleted(self):
+        return [call[1] for call in self.calls if call[0] == "delete_message"]
+
+
+class FakeModerator:
+    """Reemplazo de moderate_content que devuelve un resultado fijo"""
+
+    def __init__(self, result):
+        self.result = result
+        self.calls = []
+
+    async def __call__(self, chain, group_guidelines, message_text, username):
+        self.calls.append(message_text)
+        return self.result
+
+
+def make_update(text=None, caption=None, edited=False, photo=None, message_id=MESSAGE_ID):
+    message = SimpleNamespace(
+        message_id=message_id,
+        text=text,
+        caption=caption,
+        photo=photo or [],
+        **{attr: None for attr in deduplication._MEDIA_ATTRIBUTES},
+    )
+    return SimpleNamespace(
+        effective_message=message,
+        edited_message=message if edited else None,
+        effective_chat=SimpleNamespace(id=CHAT_ID),
+        effective_user=SimpleNamespace(id=USER_ID, username="ana", first_name="Ana"),
+    )
+
+
+def run(update, bot):
+    asyncio.run(telegram_handlers.moderate_message(update, SimpleNamespace(bot=bot)))
+
+
+@pytest.fixture(autouse=True)
+def clear_caches():
+    guidelines._compiled_cache.clear()
+    deduplication._moderated_texts.clear()
+    deduplication._media_verdicts.clear()
+    yield
+    guidelines._compiled_cache.clear()
+    deduplication._moderated_texts.clear()
+    deduplication._media_verdicts.clear()
+
+
+@pytest.fixture
+def moderator(monkeypatch):
+    fake = FakeModerator(ModeratorOutput(is_appropriate=True))
+    monkeypatch.setattr(telegram_handlers, "moderate_content", fake)
+    monkeypatch.setattr(telegram_handlers, "get_moderator_agent", lambda: None)
+    return fake
+
+
+def test_deterministic_violation_skips_model(moderator):
+    bot = FakeBot()
+    run(make_update(text="Visiten www.spam.com"), bot)
+
+    assert moderator.calls == []
+    assert bot.deleted() == [MESSAGE_ID]
+    assert not any("Revisando" in text for text in bot.sent_texts())
+    assert "Regla 1: No se permiten enlaces." in bot.sent_texts()[0]
+
+
+def test_approved_text_is_remembered(moderator):
+    bot = FakeBot()
+    run(make_update(text="Hola a todos!"), bot)
+
+    assert moderator.calls == ["Hola a todos!"]
+    assert bot.deleted() == [STATUS_MESSAGE_ID]
+    assert deduplication.get_moderated_text(CHAT_ID, MESSAGE_ID) == "hola a todos"
+
+
+def test_trivial_edit_returns_early(moderator):
+    deduplication.remember_moderated_text(CHAT_ID, MESSAGE_ID, "Muchas graicas por todo")
+    bot = FakeBot()
+    run(make_update(text="Muchas gracias por todo", edited=True), bot)
+
+    assert moderator.calls == []
+    assert bot.calls == ["get_chat"]
+
+
+def test_trivial_edit_still_runs_deterministic_checks(moderator, monkeypatch):
+    deduplication.remember_moderated_text(CHAT_ID, MESSAGE_ID, "visita ejemplo")
+    # Aunque la edición se considerara trivial, las reglas deterministas se aplican antes
+    monkeypatch.setattr(telegram_handlers, "is_trivial_edit", lambda previous, current: True)
+    bot = FakeBot()
+    run(make_update(text="visita ejemplo.com", edited=True), bot)
+
+    assert moderator.calls == []
+    assert bot.deleted() == [MESSAGE_ID]
+
+
+def test_non_trivial_edit_is_moderated(moderator):
+    deduplication.remember_moderated_text(CHAT_ID, MESSAGE_ID, "Yo no apoyo eso")
+    moderator.result = ModeratorOutput(is_appropriate=False, violation_reason="Apoya la violencia")
+    bot = FakeBot()
+    run(make_update(text="Yo si apoyo eso", edited=True), bot)
+
+    assert moderator.calls == ["Yo si apoyo eso"]
+    assert bot.deleted() == [MESSAGE_ID, STATUS_MESSAGE_ID]
+
+
+def test_cached_media_verdict_skips_model(moderator):
+    moderator.result = ModeratorOutput(
+        is_appropriate=False,
+        violation_reason="Spam de @ana",
+        improved_message="Texto sugerido para @ana",
+    )
+    photo = [SimpleNamespace(file_unique_id="spam-image")]
+
+    first_bot = FakeBot()
+    run(make_update(caption="Gana dinero fácil", photo=photo), first_bot)
+    assert moderator.calls == ["Gana dinero fácil"]
+
+    second_bot = FakeBot()
+    run(make_update(caption="Gana dinero fácil", photo=photo, message_id=20), second_bot)
+
+    assert moderator.calls == ["Gana dinero fácil"]
+    assert second_bot.deleted() == [20]
+    notification = second_bot.sent_texts()[0]
+    assert telegram_handlers.MEDIA_VIOLATION_REASON in notification
+    assert "@ana" not in notification.split("\n", 1)[1]
+
+
+def test_failed_evaluation_is_not_cached(moderator):
+    failed = ModeratorOutput(is_appropriate=False, violation_reason="Error")
+    failed._evaluation_failed = True
+    moderator.result = failed
+    photo = [SimpleNamespace(file_unique_id="image")]
+
+    run(make_update(caption="Hola", photo=photo), FakeBot())
+
+    assert deduplication._media_verdicts == {}
+
+
+def test_evaluation_flag_is_not_requested_from_model():
+    assert "evaluation_failed" not in ModeratorOutput.model_json_schema()["properties"]